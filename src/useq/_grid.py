@@ -3,8 +3,9 @@ from __future__ import annotations
 import contextlib
 import math
 import warnings
-from collections.abc import Iterable, Iterator, Sequence
+from collections.abc import Iterator, Sequence
 from enum import Enum
+from functools import cached_property
 from typing import (
     TYPE_CHECKING,
     Annotated,
@@ -19,7 +20,11 @@ from annotated_types import Ge, Gt
 from pydantic import Field, PrivateAttr, field_validator, model_validator
 from typing_extensions import Self, TypeAlias
 
-from useq._point_visiting import OrderMode, TraversalOrder
+from useq._point_visiting import (
+    OrderMode,
+    TraversalOrder,
+    _order_indices,
+)
 from useq._position import (
     AbsolutePosition,
     PositionT,
@@ -27,21 +32,16 @@ from useq._position import (
     _MultiPointPlan,
 )
 
-try:
-    from shapely.geometry import Polygon, box
-    from shapely.prepared import prep
-
-    shapely_installed = True
-except ImportError:
-    raise ImportError(
-        "plan_polygon_tiling requires shapely. "
-        "Please install it with 'pip install shapely'."
-    ) from None
-
-
 if TYPE_CHECKING:
+    import shapely
+    from shapely.geometry import MultiPolygon, Polygon
+
+    # (xs, ys, rows, cols, names) arrays of grid positions
+    PositionArrays: TypeAlias = tuple[
+        np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray
+    ]
     PointGenerator: TypeAlias = Callable[
-        [np.random.RandomState, int, float, float], Iterable[tuple[float, float]]
+        [np.random.Generator, int, float, float], np.ndarray
     ]
 
 MIN_RANDOM_POINTS = 10000
@@ -143,25 +143,69 @@ class _GridPlan(_MultiPointPlan[PositionT]):
         order: OrderMode | None = None,
     ) -> Iterator[PositionT]:
         """Iterate over all grid positions, given a field of view size."""
+        arrays = self._grid_position_arrays(fov_width, fov_height, order=order)
+        pos_cls = RelativePosition if self.is_relative else AbsolutePosition
+        for xs, ys, rs, cs, names in _iter_chunks(arrays):
+            for x, y, r, c, name in zip(
+                xs.tolist(), ys.tolist(), rs.tolist(), cs.tolist(), names.tolist()
+            ):
+                yield pos_cls(x=x, y=y, row=r, col=c, name=name)  # type: ignore [misc]
+
+    def iter_grid_position_arrays(
+        self,
+        fov_width: float | None = None,
+        fov_height: float | None = None,
+        *,
+        order: OrderMode | None = None,
+        chunk_size: int = 4096,
+    ) -> Iterator[PositionArrays]:
+        """Iterate over the positions of the plan in chunks of numpy arrays.
+
+        This yields the same positions as iterating over the plan, but as
+        `(xs, ys, rows, cols, names)` arrays of (at most) `chunk_size` positions each,
+        for consumers that only need the coordinates and want to avoid creating a
+        position object for every tile.
+        """
+        arrays = self._grid_position_arrays(fov_width, fov_height, order=order)
+        return _iter_chunks(arrays, chunk_size)
+
+    def _grid_position_arrays(
+        self,
+        fov_width: float | None = None,
+        fov_height: float | None = None,
+        *,
+        order: OrderMode | None = None,
+    ) -> PositionArrays:
+        """Return `(xs, ys, rows, cols, names)` arrays of all grid positions."""
         _fov_width = fov_width or self.fov_width or 1.0
         _fov_height = fov_height or self.fov_height or 1.0
-        order = self.mode if order is None else OrderMode(order)
+        rs, cs, xs, ys = self._grid_xy_arrays(_fov_width, _fov_height, order=order)
+        return xs, ys, rs, cs, _position_names(len(xs))
 
-        dx, dy = self._step_size(_fov_width, _fov_height)
+    def _grid_xy_arrays(
+        self,
+        fov_width: float,
+        fov_height: float,
+        *,
+        order: OrderMode | None = None,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Return `(rows, cols, xs, ys)` arrays of all grid positions, in visit order.
+
+        The coordinates are computed with numpy for the whole grid at once, so that
+        plans with many tiles don't pay for a python loop over every position.
+        """
+        order = self.mode if order is None else OrderMode(order)
+        dx, dy = self._step_size(fov_width, fov_height)
         rows = self._nrows(dy)
         cols = self._ncolumns(dx)
-        x0 = self._offset_x(dx)
-        y0 = self._offset_y(dy)
 
-        pos_cls = RelativePosition if self.is_relative else AbsolutePosition
-        for idx, (r, c) in enumerate(order.generate_indices(rows, cols)):
-            yield pos_cls(  # type: ignore [misc]
-                x=x0 + c * dx,
-                y=y0 - r * dy,
-                row=r,
-                col=c,
-                name=f"{str(idx).zfill(4)}",
-            )
+        # x for each column, y for each row
+        col_x = self._offset_x(dx) + np.arange(cols) * dx
+        row_y = self._offset_y(dy) - np.arange(rows) * dy
+
+        # copy, as the (possibly cached) traversal indices are read-only
+        rs, cs = _order_indices(order, rows, cols).T.copy()
+        return rs, cs, col_x[cs], row_y[rs]
 
     def __iter__(self) -> Iterator[PositionT]:  # type: ignore [override]
         yield from self.iter_grid_positions()
@@ -172,6 +216,22 @@ class _GridPlan(_MultiPointPlan[PositionT]):
         return dx, dy
 
 
+def _position_names(n: int) -> np.ndarray:
+    """Return the zero-padded names ("0000", "0001", ...) of `n` positions."""
+    return np.char.zfill(np.arange(n).astype(str), 4)
+
+
+def _iter_chunks(
+    arrays: PositionArrays, chunk_size: int = 4096
+) -> Iterator[PositionArrays]:
+    """Return an iterator over slices of (at most) `chunk_size` items of `arrays`."""
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be at least 1, got {chunk_size}")
+    xs, ys, rs, cs, names = arrays
+    chunks = (slice(i, i + chunk_size) for i in range(0, len(xs), chunk_size))
+    return ((xs[c], ys[c], rs[c], cs[c], names[c]) for c in chunks)
+
+
 class GridFromEdges(_GridPlan[AbsolutePosition]):
     """Yield absolute stage positions to cover a bounded area.
 
@@ -442,7 +502,11 @@ class GridFromPolygon(_GridPlan[AbsolutePosition]):
             "improve tile coverage.",
         ),
     ]
-    _prepared_poly: Annotated[Optional[object], Field(...)] = PrivateAttr(None)
+    _poly: Annotated[Optional[object], Field(...)] = PrivateAttr(None)
+    _hull_vertices: Annotated[
+        Optional[tuple[tuple[float, float], ...]],
+        Field(..., description="Closed, counter-clockwise ring of the convex hull"),
+    ] = PrivateAttr(None)
     _top_bound: Annotated[Optional[float], Field(..., init=False)] = PrivateAttr(None)
     _left_bound: Annotated[Optional[float], Field(..., init=False)] = PrivateAttr(None)
     _bottom_bound: Annotated[Optional[float], Field(..., init=False)] = PrivateAttr(
@@ -455,19 +519,37 @@ class GridFromPolygon(_GridPlan[AbsolutePosition]):
     ] = PrivateAttr(None)
 
     def model_post_init(self, __context) -> None:
+        try:
+            import shapely
+            from shapely.geometry import Polygon
+
+            # tiling uses the vectorized shapely 2.x API
+            if int(shapely.__version__.split(".")[0]) < 2:
+                raise ImportError
+        except ImportError:
+            raise ImportError(
+                "GridFromPolygon requires shapely>=2.0. "
+                "Please install it with 'pip install \"shapely>=2.0\"'."
+            ) from None
+
         poly = Polygon(self.polygon)
         if not poly.is_valid:
             raise ValueError("Invalid or self-intersecting polygon.")
         # Buffers the polygon with a given diistance
         if self.offset is not None:
-            poly = self._offset_polygon(Polygon(self.polygon), self.offset)
+            poly = self._offset_polygon(poly, self.offset)
+            if poly.is_empty:
+                raise ValueError(
+                    f"Offset {self.offset} leaves nothing of the polygon to tile."
+                )
         # Creates a convex hull of the input polygon
         if self.convex_hull:
             poly = poly.convex_hull
+            ring = poly.exterior
+            coords = tuple(ring.coords)
+            self._hull_vertices = coords if ring.is_ccw else coords[::-1]
         self._plot_poly = poly
-        self._prepared_poly = prep(
-            poly
-        )  # operations on prepared polygon are more efficient.
+        self._poly = poly
 
         self._left_bound, self._bottom_bound, self._right_bound, self._top_bound = (
             poly.bounds
@@ -478,7 +560,16 @@ class GridFromPolygon(_GridPlan[AbsolutePosition]):
         self._bottom_bound -= self.fov_height / 4
         self._right_bound += self.fov_width / 4
 
-    def _offset_polygon(self, vertices, offset) -> list:
+    # built lazily, and not a private attribute, because pydantic compares private
+    # attributes in __eq__ and an STRtree only compares equal to itself.
+    @cached_property
+    def _edge_tree(self) -> shapely.STRtree:
+        """Spatial index of the polygon's boundary segments."""
+        return _boundary_segment_tree(self._poly)
+
+    def _offset_polygon(
+        self, vertices: Polygon, offset: float
+    ) -> Polygon | MultiPolygon:
         """Offsets/buffers the polygon with a given distance and joins when overlapping."""
         geom = vertices
         vertices = geom.buffer(distance=offset, cap_style="round", join_style="round")
@@ -488,16 +579,64 @@ class GridFromPolygon(_GridPlan[AbsolutePosition]):
         """Loops through bounding box grid positions and yields/retains the position
         if the tile intersects with the polygon.
         """
-        grid_from_bounding_box = self.iter_grid_positions()
-        for position in list(grid_from_bounding_box):
-            tile = box(
-                position.x - self.fov_width / 2,
-                position.y - self.fov_height / 2,
-                position.x + self.fov_width / 2,
-                position.y + self.fov_height / 2,
+        # only create positions for the tiles that are kept
+        for xs, ys, rs, cs, names in self.iter_grid_position_arrays():
+            for x, y, r, c, name in zip(
+                xs.tolist(), ys.tolist(), rs.tolist(), cs.tolist(), names.tolist()
+            ):
+                yield AbsolutePosition(x=x, y=y, row=r, col=c, name=name)
+
+    def iter_grid_position_arrays(
+        self,
+        fov_width: float | None = None,
+        fov_height: float | None = None,
+        *,
+        order: OrderMode | None = None,
+        chunk_size: int = 4096,
+    ) -> Iterator[PositionArrays]:
+        """Iterate over the positions within the polygon in chunks of numpy arrays.
+
+        Like iterating over the plan, only tiles that intersect the polygon are
+        yielded, and their names are the index of the tile in the full bounding box
+        grid.
+        """
+        fov_width = fov_width or self.fov_width or 1.0
+        fov_height = fov_height or self.fov_height or 1.0
+        xs, ys, rs, cs, names = self._grid_position_arrays(
+            fov_width, fov_height, order=order
+        )
+        mask = self._polygon_tile_mask(xs, ys, fov_width, fov_height)
+        arrays = (xs[mask], ys[mask], rs[mask], cs[mask], names[mask])
+        return _iter_chunks(arrays, chunk_size)
+
+    def _polygon_tile_mask(
+        self, xs: np.ndarray, ys: np.ndarray, fov_width: float, fov_height: float
+    ) -> np.ndarray:
+        """Return a mask of the tiles centered on (xs, ys) that touch the polygon."""
+        import shapely
+
+        half_w, half_h = fov_width / 2, fov_height / 2
+        x_lo, x_hi = xs - half_w, xs + half_w
+        y_lo, y_hi = ys - half_h, ys + half_h
+
+        # tiles that don't overlap the polygon's bounding box can't intersect it
+        xmin, ymin, xmax, ymax = self._poly.bounds
+        mask = (x_hi >= xmin) & (x_lo <= xmax) & (y_hi >= ymin) & (y_lo <= ymax)
+        idx = np.flatnonzero(mask)
+        if self._hull_vertices is not None:
+            # convex polygons can be tested directly with numpy
+            mask[idx] = _tiles_in_convex(
+                x_lo[idx], y_lo[idx], x_hi[idx], y_hi[idx], self._hull_vertices
             )
-            if self._prepared_poly.intersects(tile):
-                yield position
+        else:
+            # a tile intersects the polygon if it crosses the boundary, or if it lies
+            # entirely inside the polygon (in which case its center does too)
+            tiles = shapely.box(x_lo[idx], y_lo[idx], x_hi[idx], y_hi[idx])
+            tile_idx, _ = self._edge_tree.query(tiles, predicate="intersects")
+            hit = shapely.contains_xy(self._poly, xs[idx], ys[idx])
+            hit[tile_idx] = True
+            mask[idx] = hit
+        return mask
 
     @property
     def is_relative(self) -> bool:
@@ -557,12 +696,51 @@ class GridFromPolygon(_GridPlan[AbsolutePosition]):
         """Return the number of positions within the polygon."""
         if self.fov_width is None or self.fov_height is None:
             raise ValueError("fov_width and fov_height must be set")
-        return sum(1 for _ in self._intersect_raster_with_polygon())
+        # count the tiles directly, without creating a position for each one
+        _, _, xs, ys = self._grid_xy_arrays(self.fov_width, self.fov_height)
+        mask = self._polygon_tile_mask(xs, ys, self.fov_width, self.fov_height)
+        return int(np.count_nonzero(mask))
 
     def __iter__(self) -> Iterator[PositionT]:
         yield from self._intersect_raster_with_polygon()
 
 
+def _boundary_segment_tree(poly: Polygon | MultiPolygon) -> shapely.STRtree:
+    """Return an STRtree of every segment of the polygon's exterior and interiors."""
+    import shapely
+
+    rings = shapely.get_rings(shapely.get_parts(poly))
+    coords = [np.asarray(ring.coords) for ring in rings]
+    segments = np.concatenate([np.stack([c[:-1], c[1:]], axis=1) for c in coords])
+    return shapely.STRtree(shapely.linestrings(segments))
+
+
+def _tiles_in_convex(
+    x_lo: np.ndarray,
+    y_lo: np.ndarray,
+    x_hi: np.ndarray,
+    y_hi: np.ndarray,
+    vertices: Sequence[tuple[float, float]],
+) -> np.ndarray:
+    """Return a mask of the axis-aligned tiles that intersect a convex polygon.
+
+    `vertices` is the closed ring (N + 1 points) of a counter-clockwise polygon.  Tiles
+    are assumed to already overlap the polygon's bounding box, so (by the separating
+    axis theorem) a tile misses the polygon only if all four of its corners lie
+    outside the same edge.  Touching counts as intersecting, as in shapely.
+    """
+    corners = ((x_lo, y_lo), (x_lo, y_hi), (x_hi, y_lo), (x_hi, y_hi))
+    hit = np.ones(len(x_lo), dtype=bool)
+    for (vx, vy), (wx, wy) in zip(vertices[:-1], vertices[1:]):
+        ex, ey = wx - vx, wy - vy
+        # a negative cross product puts the corner to the right of (outside) the edge
+        outside = np.ones(len(x_lo), dtype=bool)
+        for cx, cy in corners:
+            outside &= ex * (cy - vy) - ey * (cx - vx) < 0
+        hit &= ~outside
+    return hit
+
+
 # ------------------------ RANDOM ------------------------
 
 
@@ -633,93 +811,111 @@ class RandomPoints(_MultiPointPlan[RelativePosition]):
         return self
 
     def __iter__(self) -> Iterator[RelativePosition]:  # type: ignore [override]
-        seed = np.random.RandomState(self.random_seed)
+        rng = np.random.default_rng(self.random_seed)
         func = _POINTS_GENERATORS[self.shape]
 
-        points: list[tuple[float, float]] = []
-        needed_points = self.num_points
+        # accepted points are stored in a contiguous (num_points, 2) buffer
+        points = np.empty((self.num_points, 2), dtype=np.float64)
+        n_points = 0
         start_at = self.start_at
         if isinstance(start_at, RelativePosition):
-            points = [(start_at.x, start_at.y)]
-            needed_points -= 1
+            points[0] = start_at.x, start_at.y
+            n_points = 1
             start_at = 0
+        needed_points = self.num_points - n_points
 
         # in the easy case, just generate the requested number of points
         if self.allow_overlap or self.fov_width is None or self.fov_height is None:
-            _points = func(seed, needed_points, self.max_width, self.max_height)
-            points.extend(_points)
+            points[n_points:] = func(
+                rng, needed_points, self.max_width, self.max_height
+            )
+            n_points = self.num_points
 
         else:
             # if we need to avoid overlap, generate points, check if they are valid, and
             # repeat until we have enough
             per_iter = needed_points
             tries = 0
-            while tries < MIN_RANDOM_POINTS and len(points) < self.num_points:
-                candidates = func(seed, per_iter, self.max_width, self.max_height)
+            while tries < MIN_RANDOM_POINTS and n_points < self.num_points:
+                candidates = func(rng, per_iter, self.max_width, self.max_height)
                 tries += per_iter
-                for p in candidates:
-                    if _is_a_valid_point(points, *p, self.fov_width, self.fov_height):
-                        points.append(p)
-                        if len(points) >= self.num_points:
-                            break
+                n_points = _filter_nonoverlapping(
+                    candidates, points, n_points, self.fov_width, self.fov_height
+                )
 
-            if len(points) < self.num_points:
+            if n_points < self.num_points:
                 warnings.warn(
                     f"Unable to generate {self.num_points} non-overlapping points. "
-                    f"Only {len(points)} points were found.",
+                    f"Only {n_points} points were found.",
                     stacklevel=2,
                 )
 
+        points = points[:n_points]
         if self.order is not None:
-            points = self.order(points, start_at=start_at)  # type: ignore [assignment]
+            points = self.order(points, start_at=start_at)
 
-        for idx, (x, y) in enumerate(points):
-            yield RelativePosition(x=x, y=y, name=f"{str(idx).zfill(4)}")
+        names = _position_names(len(points)).tolist()
+        for (x, y), name in zip(points.tolist(), names):
+            yield RelativePosition(x=x, y=y, name=name)
 
     def num_positions(self) -> int:
         return self.num_points
 
 
-def _is_a_valid_point(
-    points: list[tuple[float, float]],
-    x: float,
-    y: float,
+def _filter_nonoverlapping(
+    candidates: np.ndarray,
+    accepted: np.ndarray,
+    n_accepted: int,
     min_dist_x: float,
     min_dist_y: float,
-) -> bool:
-    """Return True if the the point is at least min_dist away from all the others.
+) -> int:
+    """Append the `candidates` that don't overlap any point already in `accepted`.
+
+    `accepted` is a preallocated (num_points, 2) buffer, of which the first
+    `n_accepted` rows are filled.  Candidates are checked in order and written to
+    the buffer until it is full.  Returns the new number of accepted points.
 
     note: using Manhattan distance.
     """
-    return not any(
-        abs(x - point_x) < min_dist_x and abs(y - point_y) < min_dist_y
-        for point_x, point_y in points
-    )
+    target = len(accepted)
+    for x, y in candidates:
+        if n_accepted >= target:
+            break
+        prev = accepted[:n_accepted]
+        overlap = (np.abs(prev[:, 0] - x) < min_dist_x) & (
+            np.abs(prev[:, 1] - y) < min_dist_y
+        )
+        if not overlap.any():
+            accepted[n_accepted] = x, y
+            n_accepted += 1
+    return n_accepted
 
 
 def _random_points_in_ellipse(
-    seed: np.random.RandomState, n_points: int, max_width: float, max_height: float
+    rng: np.random.Generator, n_points: int, max_width: float, max_height: float
 ) -> np.ndarray:
-    """Generate a random point around a circle with center (0, 0).
+    """Generate random points uniformly distributed in an ellipse centered at (0, 0).
 
-    The point is within +/- radius_x and +/- radius_y at a random angle.
+    The ellipse has radii max_width / 2 and max_height / 2.  Radii are drawn as the
+    square root of a uniform sample, so that points are uniform over the area
+    (rather than clustered around the center).
     """
-    points = seed.uniform(0, 1, size=(n_points, 3))
-    xy = points[:, :2]
-    angle = points[:, 2] * 2 * np.pi
-    xy[:, 0] *= (max_width / 2) * np.cos(angle)
-    xy[:, 1] *= (max_height / 2) * np.sin(angle)
+    radius = np.sqrt(rng.random(n_points))
+    angle = rng.random(n_points) * (2 * np.pi)
+    xy = np.empty((n_points, 2))
+    xy[:, 0] = (max_width / 2) * radius * np.cos(angle)
+    xy[:, 1] = (max_height / 2) * radius * np.sin(angle)
     return xy
 
 
 def _random_points_in_rectangle(
-    seed: np.random.RandomState, n_points: int, max_width: float, max_height: float
+    rng: np.random.Generator, n_points: int, max_width: float, max_height: float
 ) -> np.ndarray:
     """Generate a random point around a rectangle with center (0, 0).
 
     The point is within the bounding box (-width/2, -height/2, width, height).
     """
-    xy = seed.uniform(0, 1, size=(n_points, 2))
+    xy = rng.random(size=(n_points, 2))
     xy[:, 0] = (xy[:, 0] * max_width) - (max_width / 2)
     xy[:, 1] = (xy[:, 1] * max_height) - (max_height / 2)
     return xy
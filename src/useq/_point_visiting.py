@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from collections.abc import Iterable, Iterator
 from enum import Enum
-from functools import partial
+from functools import lru_cache, partial
 from typing import Callable
 
 import numpy as np
@@ -76,18 +76,51 @@ def _spiral_indices(
         x, y = x + dx, y + dy
 
 
+def _spiral_index_array(rows: int, columns: int) -> np.ndarray:
+    """Return the (rows * columns, 2) array of (row, col) indices of `_spiral_indices`.
+
+    Rather than walking the spiral, this computes the position of every cell along
+    it in closed form and sorts the cells by that position.  Ring `k` of the spiral
+    holds the cells at Chebyshev distance `k` from the center.  It starts just
+    above the bottom right corner and runs up the right side, then along the top,
+    down the left side and along the bottom.
+    """
+    r, c = np.divmod(np.arange(rows * columns), columns)
+    x = c - (columns - 1) // 2
+    y = r - (rows - 1) // 2
+    k = np.maximum(np.abs(x), np.abs(y))
+    start = (2 * k - 1) ** 2  # number of cells inside ring k
+    position = np.select(
+        [k == 0, (x == k) & (y > -k), y == k, x == -k],
+        [0, start + y + k - 1, start + 3 * k - 1 - x, start + 5 * k - 1 - y],
+        default=start + 7 * k - 1 + x,
+    )
+    order = np.argsort(position)
+    return np.stack([r[order], c[order]], axis=1)
+
+
 # function that iterates indices (row, col) in a grid where (0, 0) is the top left
 def _rect_indices(
     rows: int, columns: int, snake: bool = False, row_wise: bool = True
 ) -> Iterator[tuple[int, int]]:
     """Return a row or column-wise iterator over a 2D grid."""
+    indices = _rect_index_array(rows, columns, snake=snake, row_wise=row_wise)
+    return zip(indices[:, 0], indices[:, 1])  # pyright: ignore
+
+
+def _rect_index_array(
+    rows: int, columns: int, snake: bool = False, row_wise: bool = True
+) -> np.ndarray:
+    """Return the (rows * columns, 2) array of (row, col) indices of `_rect_indices`."""
     c, r = np.meshgrid(np.arange(columns), np.arange(rows))
     if snake:
         if row_wise:
             c[1::2, :] = c[1::2, :][:, ::-1]
         else:
             r[:, 1::2] = r[:, 1::2][::-1, :]
-    return zip(r.ravel(), c.ravel()) if row_wise else zip(r.T.ravel(), c.T.ravel())  # pyright: ignore
+    if not row_wise:
+        r, c = r.T, c.T
+    return np.stack([r.ravel(), c.ravel()], axis=1)
 
 
 IndexGenerator = Callable[[int, int], Iterator[tuple[int, int]]]
@@ -99,6 +132,44 @@ _INDEX_GENERATORS: dict[OrderMode, IndexGenerator] = {
     OrderMode.spiral: _spiral_indices,
 }
 
+# build the whole (rows * columns, 2) index array of each mode at once
+_INDEX_ARRAYS: dict[OrderMode, Callable[[int, int], np.ndarray]] = {
+    OrderMode.row_wise: partial(_rect_index_array, snake=False, row_wise=True),
+    OrderMode.column_wise: partial(_rect_index_array, snake=False, row_wise=False),
+    OrderMode.row_wise_snake: partial(_rect_index_array, snake=True, row_wise=True),
+    OrderMode.column_wise_snake: partial(_rect_index_array, snake=True, row_wise=False),
+    OrderMode.spiral: _spiral_index_array,
+}
+
+
+# only grids up to this many positions keep their traversal in the cache, which
+# bounds the cache to ~2 MB (32 entries of at most 64 kB each)
+_MAX_CACHED_POSITIONS = 8192
+
+
+def _order_indices(mode: OrderMode, rows: int, columns: int) -> np.ndarray:
+    """Return the (rows * columns, 2) array of (row, col) indices visited by `mode`.
+
+    Small grids are cached, so repeated iteration over the same grid doesn't
+    regenerate the traversal.  The returned array is read-only, as it may be shared
+    between callers.
+    """
+    if rows * columns <= _MAX_CACHED_POSITIONS:
+        return _cached_order_indices(mode, rows, columns)
+    return _build_order_indices(mode, rows, columns)
+
+
+@lru_cache(maxsize=32)
+def _cached_order_indices(mode: OrderMode, rows: int, columns: int) -> np.ndarray:
+    return _build_order_indices(mode, rows, columns)
+
+
+def _build_order_indices(mode: OrderMode, rows: int, columns: int) -> np.ndarray:
+    indices = _INDEX_ARRAYS[mode](rows, columns).astype(np.int32)
+    indices.flags.writeable = False
+    return indices
+
+
 # ----------------------------- Random Points -----------------------------------
 
 
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+import sys
 from typing import TYPE_CHECKING, Any, Optional, get_args
 
+import numpy as np
 import pytest
 from pydantic import TypeAdapter
 
@@ -76,9 +78,9 @@ g_inputs = [
             random_seed=0,
         ),
         [
-            useq.RelativePosition(x=-0.9, y=-1.1, name="0000"),
-            useq.RelativePosition(x=0.9, y=-0.5, name="0001"),
-            useq.RelativePosition(x=-0.8, y=-0.4, name="0002"),
+            useq.RelativePosition(x=1.6, y=0.2, name="0000"),
+            useq.RelativePosition(x=0.4, y=-1.2, name="0001"),
+            useq.RelativePosition(x=0.3, y=-0.3, name="0002"),
         ],
     ),
 ]
@@ -130,6 +132,14 @@ def test_spiral_indices() -> None:
     ]
 
 
+@pytest.mark.parametrize("shape", [(1, 1), (1, 5), (2, 3), (4, 4), (7, 2), (6, 9)])
+def test_spiral_index_array(shape: tuple[int, int]) -> None:
+    from useq._point_visiting import _spiral_index_array
+
+    indices = _spiral_index_array(*shape)
+    assert list(map(tuple, indices.tolist())) == list(_spiral_indices(*shape))
+
+
 def test_position_equality() -> None:
     """Order of grid positions should only change the order in which they are yielded"""
 
@@ -204,8 +214,8 @@ def test_num_position_error() -> None:
         useq.GridWidthHeight(width=2, height=2).num_positions()
 
 
-expected_rectangle = [(0.2, 1.1), (0.4, 0.2), (-0.3, 0.7)]
-expected_ellipse = [(-0.9, -1.1), (0.9, -0.5), (-0.8, -0.4)]
+expected_rectangle = [(0.5, -1.2), (-1.8, -2.4), (1.3, 2.1)]
+expected_ellipse = [(1.6, 0.2), (0.4, -1.2), (0.3, -0.3)]
 
 
 @pytest.mark.parametrize("n_points", [3, 100])
@@ -282,3 +292,191 @@ def test_grid_from_edges_plot(monkeypatch: pytest.MonkeyPatch) -> None:
     useq.GridFromEdges(
         overlap=10, top=0, left=0, bottom=20, right=30, fov_height=10, fov_width=20
     ).plot()
+
+
+def test_grid_from_polygon() -> None:
+    pytest.importorskip("shapely")
+
+    # L-shaped (concave) polygon
+    poly = [(0, 0), (30, 0), (30, 30), (20, 30), (20, 10), (0, 10)]
+    plan = useq.GridFromPolygon(polygon=poly, fov_width=10, fov_height=10)
+    positions = list(plan)
+    assert [(p.row, p.col) for p in positions] == [
+        (0, 2),
+        (0, 3),
+        (1, 3),
+        (1, 2),
+        (2, 0),
+        (2, 1),
+        (2, 2),
+        (2, 3),
+        (3, 3),
+        (3, 2),
+        (3, 1),
+        (3, 0),
+    ]
+    # names are the index in the bounding box grid
+    assert positions[0] == useq.Position(x=22.5, y=27.5, name="0002", row=0, col=2)
+    assert plan.num_positions() == len(positions)
+
+
+def test_random_points_in_ellipse() -> None:
+    from useq._grid import _random_points_in_ellipse
+
+    xy = _random_points_in_ellipse(np.random.default_rng(0), 10000, 4, 2)
+    r = np.hypot(xy[:, 0] / 2, xy[:, 1])
+    assert np.all(r <= 1)
+    # uniform over the area: a quarter of the points fall within half the radius
+    assert np.isclose(np.mean(r < 0.5), 0.25, atol=0.02)
+
+
+# a spiral-like polygon whose inner gap closes into a hole when offset
+HOLLOW_POLY = [
+    (0, 0),
+    (100, 0),
+    (100, 100),
+    (0, 100),
+    (0, 90),
+    (90, 90),
+    (90, 10),
+    (2, 10),
+    (2, 88),
+    (0, 88),
+]
+
+
+# a concave polygon whose convex hull has slanted edges
+IRREGULAR_POLY = [(0, 0), (100, 10), (60, 40), (90, 90), (10, 70), (30, 40)]
+
+
+@pytest.mark.parametrize(
+    "polygon", [HOLLOW_POLY, IRREGULAR_POLY], ids=["hollow", "irregular"]
+)
+@pytest.mark.parametrize("convex_hull", [False, True])
+@pytest.mark.parametrize("offset", [None, 1.5])
+def test_grid_from_polygon_matches_shapely(
+    polygon: list[tuple[float, float]], convex_hull: bool, offset: float | None
+) -> None:
+    shapely = pytest.importorskip("shapely")
+
+    plan = useq.GridFromPolygon(
+        polygon=polygon,
+        convex_hull=convex_hull,
+        offset=offset,
+        fov_width=3,
+        fov_height=4,
+    )
+    poly = plan._plot_poly
+    # tiles must be exactly the bounding box tiles that shapely says intersect
+    expected = [
+        p
+        for p in plan.iter_grid_positions()
+        if shapely.box(p.x - 1.5, p.y - 2, p.x + 1.5, p.y + 2).intersects(poly)
+    ]
+    assert list(plan) == expected
+
+
+def test_iter_grid_position_arrays() -> None:
+    plan = useq.GridRowsColumns(rows=3, columns=4, overlap=10, mode="spiral")
+    chunks = list(plan.iter_grid_position_arrays(2, 2, chunk_size=5))
+    assert [len(xs) for xs, *_ in chunks] == [5, 5, 2]
+
+    xs, ys, rows, cols, names = (np.concatenate(a) for a in zip(*chunks))
+    positions = list(plan.iter_grid_positions(2, 2))
+    assert xs.tolist() == [p.x for p in positions]
+    assert ys.tolist() == [p.y for p in positions]
+    assert rows.tolist() == [p.row for p in positions]
+    assert cols.tolist() == [p.col for p in positions]
+    assert names.tolist() == [p.name for p in positions]
+    rows += 1  # chunks are writable copies, not views of the cached traversal
+
+    for bad_size in (0, -1):
+        with pytest.raises(ValueError, match="chunk_size must be at least 1"):
+            next(plan.iter_grid_position_arrays(chunk_size=bad_size))
+
+
+def test_grid_from_polygon_position_arrays() -> None:
+    pytest.importorskip("shapely")
+
+    poly = [(0, 0), (30, 0), (30, 30), (20, 30), (20, 10), (0, 10)]
+    plan = useq.GridFromPolygon(polygon=poly, fov_width=10, fov_height=10)
+    chunks = list(plan.iter_grid_position_arrays(chunk_size=5))
+    assert [len(xs) for xs, *_ in chunks] == [5, 5, 2]
+
+    xs, ys, rows, cols, names = (np.concatenate(a) for a in zip(*chunks))
+    positions = list(plan)
+    assert xs.tolist() == [p.x for p in positions]
+    assert ys.tolist() == [p.y for p in positions]
+    assert rows.tolist() == [p.row for p in positions]
+    assert cols.tolist() == [p.col for p in positions]
+    assert names.tolist() == [p.name for p in positions]
+
+
+@pytest.mark.parametrize("convex_hull", [False, True])
+def test_grid_from_polygon_equality(convex_hull: bool) -> None:
+    pytest.importorskip("shapely")
+
+    kwargs = {"polygon": HOLLOW_POLY, "convex_hull": convex_hull, "fov_width": 3}
+    plan = useq.GridFromPolygon(**kwargs, fov_height=4)
+    other = useq.GridFromPolygon(**kwargs, fov_height=4)
+    list(plan)  # build any lazily cached state on one of them
+    assert plan == other
+    assert plan != useq.GridFromPolygon(**kwargs, fov_height=5)
+
+
+def test_grid_from_polygon_requires_shapely(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setitem(sys.modules, "shapely", None)
+    monkeypatch.setitem(sys.modules, "shapely.geometry", None)
+    # other grid plans don't need shapely
+    assert len(list(useq.GridRowsColumns(rows=2, columns=2))) == 4
+    with pytest.raises(ImportError, match="GridFromPolygon requires shapely"):
+        useq.GridFromPolygon(polygon=HOLLOW_POLY, fov_width=3, fov_height=4)
+
+
+def test_grid_from_polygon_requires_shapely_2(monkeypatch: pytest.MonkeyPatch) -> None:
+    shapely = pytest.importorskip("shapely")
+
+    monkeypatch.setattr(shapely, "__version__", "1.8.5")
+    with pytest.raises(ImportError, match=r"GridFromPolygon requires shapely>=2\.0"):
+        useq.GridFromPolygon(polygon=HOLLOW_POLY, fov_width=3, fov_height=4)
+
+
+def test_grid_from_edges_model_copy() -> None:
+    plan = useq.GridFromEdges(
+        top=0, left=0, bottom=10, right=10, fov_width=2, fov_height=2
+    )
+    assert plan.num_positions() == 25
+    bigger = plan.model_copy(update={"bottom": 40, "right": 40})
+    assert bigger.num_positions() == 400
+
+
+def test_grid_rows_columns_model_copy() -> None:
+    plan = useq.GridRowsColumns(rows=2, columns=2, fov_width=1, fov_height=1)
+    bigger = plan.model_copy(update={"rows": 4, "columns": 4})
+    first = next(iter(bigger))
+    assert (first.x, first.y) == (-1.5, 1.5)
+
+
+@pytest.mark.parametrize("mode", list(OrderMode))
+def test_large_grid_indices_not_cached(mode: OrderMode) -> None:
+    from useq._point_visiting import _cached_order_indices, _order_indices
+
+    _cached_order_indices.cache_clear()
+    indices = _order_indices(mode, 100, 100)
+    assert indices.shape == (10000, 2)
+    assert list(map(tuple, indices.tolist())) == list(mode.generate_indices(100, 100))
+    assert _cached_order_indices.cache_info().currsize == 0
+
+
+@pytest.mark.parametrize("convex_hull", [False, True])
+def test_grid_from_polygon_empty_offset(convex_hull: bool) -> None:
+    pytest.importorskip("shapely")
+
+    with pytest.raises(ValueError, match="leaves nothing of the polygon"):
+        useq.GridFromPolygon(
+            polygon=HOLLOW_POLY,
+            convex_hull=convex_hull,
+            offset=-100,
+            fov_width=3,
+            fov_height=4,
+        )